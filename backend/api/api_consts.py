@@ -7,7 +7,25 @@ MAIL_PASSWORD_MISSING_MESSAGE = "Не указана электронная по
 WRONG_MAIL_PASSWORD_MESSAGE = "Неверная электронная почта или пароль"
 REPEAT_INGREDIENT_ERROR = "Ингредиент не должен повторяться"
 INGREDIENT_ADD_ERROR = "Добавьте минимум 1 ингредиент в рецепт"
+INGREDIENT_NOT_FOUND_ERROR = "Ингредиент не найден"
 MAX_VALUE_INGREDIENT = 32000
 MIN_VALUE_INGREDIENT = 1
 MAX_VALUE_COOKING_TIME = 32000
 MIN_VALUE_COOKING_TIME = 1
+TAG_SLUG_CHOICES_CACHE_KEY = "tag_slug_choices"
+TAGS_LIST_CACHE_KEY = "tags_list"
+TAGS_CACHE_TIMEOUT = 60 * 5
+SUBSCRIPTION_ANNOTATIONS = ("is_subscribed", "recipes_count")
+TOKEN_CACHE_KEY = "auth_token:{key}"
+TOKEN_CACHE_TIMEOUT = 60 * 5
+INGREDIENTS_CACHE_VERSION_KEY = "ingredients_version"
+INGREDIENTS_LIST_CACHE_KEY = "ingredients:{version}:{query}"
+INGREDIENTS_CACHE_TIMEOUT = 60 * 60
+SUBSCRIPTIONS_CACHE_VERSION_KEY = "subscriptions_version:{user_id}"
+AUTHOR_CACHE_VERSION_KEY = "author_version:{author_id}"
+SUBSCRIPTIONS_LIST_CACHE_KEY = "subscriptions:{user_id}:{version}:{query}"
+SUBSCRIPTIONS_CACHE_TIMEOUT = 60 * 15
+LOGIN_CACHE_KEY = "login:{digest}"
+LOGIN_CACHE_TIMEOUT = 60
+SELF_SUBSCRIPTION_ERROR = "Нельзя подписаться на себя"
+ALREADY_SUBSCRIBED_ERROR = "Вы уже подписаны на этого автора"
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.contrib.auth.password_validation import \
+    get_default_password_validators
 
 
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # Валидаторы паролей создаются один раз на процесс, а
+        # CommonPasswordValidator при этом читает словарь паролей.
+        # Загружаем их при старте, а не на первой регистрации.
+        get_default_password_validators()
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .api_consts import TOKEN_CACHE_KEY, TOKEN_CACHE_TIMEOUT
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кешированием результата.
+
+    Пара (пользователь, токен) хранится в кеше по ключу токена,
+    поэтому повторные запросы с тем же токеном не обращаются к БД.
+    Кеш сбрасывается сигналами при изменении токена или пользователя
+    (см. api.signals), поэтому кеширование включается только
+    с общим для всех процессов кешем (настройка CACHE_TOKEN_AUTH):
+    в локальном кеше процесса отозванный токен продолжал бы
+    действовать в остальных процессах.
+    """
+
+    def authenticate_credentials(self, key):
+        """
+        Возвращает пару (пользователь, токен) для ключа токена.
+
+        Хеш пароля пользователя в кеш не попадает: поле password
+        отложено и загружается из БД только при обращении к нему.
+
+        Параметры:
+        - key: Ключ токена из заголовка Authorization.
+
+        Исключения:
+        - AuthenticationFailed: Токен неверен или пользователь неактивен.
+        """
+        if not settings.CACHE_TOKEN_AUTH:
+            return super().authenticate_credentials(key)
+        cache_key = TOKEN_CACHE_KEY.format(key=key)
+        token = cache.get(cache_key)
+        if token is None:
+            model = self.get_model()
+            try:
+                token = (
+                    model.objects.select_related("user")
+                    .defer("user__password")
+                    .get(key=key)
+                )
+            except model.DoesNotExist:
+                raise AuthenticationFailed(_("Invalid token."))
+            cache.set(cache_key, token, TOKEN_CACHE_TIMEOUT)
+        if not token.user.is_active:
+            raise AuthenticationFailed(
+                "Пользователь неактивен или удален."
+            )
+        return token.user, token
@@ -0,0 +1,58 @@
+import time
+
+from django.core.cache import cache
+
+
+def _new_version():
+    """
+    Возвращает начальное значение версии кеша.
+
+    Версия начинается с текущего времени в наносекундах, поэтому
+    ключ версии, вытесненный из кеша и созданный заново, не вернется
+    к старому значению и не оживит записи, сохраненные под ним.
+    """
+    return time.time_ns()
+
+
+def get_cache_version(key):
+    """
+    Возвращает текущую версию кеша, создавая ее при отсутствии.
+
+    Параметры:
+    - key: Ключ версии в кеше.
+    """
+    return cache.get_or_set(key, _new_version, None)
+
+
+def get_cache_versions(keys):
+    """
+    Возвращает словарь текущих версий кеша для нескольких ключей
+    одним обращением к кешу, создавая отсутствующие версии.
+
+    Параметры:
+    - keys: Ключи версий в кеше.
+    """
+    versions = cache.get_many(keys)
+    for key in set(keys) - versions.keys():
+        versions[key] = get_cache_version(key)
+    return versions
+
+
+def bump_cache_version(key):
+    """
+    Увеличивает версию кеша, делая недействительными записи,
+    сохраненные под предыдущей версией.
+
+    Отсутствующая версия сначала создается через cache.add,
+    чтобы incr не падал на вытесненном ключе.
+
+    Параметры:
+    - key: Ключ версии в кеше.
+    """
+    cache.add(key, _new_version(), None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Ключ вытеснен между add и incr: следующее чтение создаст
+        # новую версию, старые записи использоваться не будут.
+        pass
@@ -0,0 +1,27 @@
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework.serializers import ImageField
+
+
+class Base64OrUploadedImageField(Base64ImageField):
+    """
+    Поле изображения, принимающее base64-строку или загруженный файл.
+
+    Файл из multipart/form-data запроса проверяется как обычное
+    изображение без промежуточного base64-декодирования; строка
+    обрабатывается так же, как в Base64ImageField.
+    """
+
+    def to_internal_value(self, data):
+        """
+        Возвращает файл изображения из base64-строки или загруженного файла.
+
+        Параметры:
+        - data: base64-строка или UploadedFile.
+
+        Возвращает:
+        - Файл изображения.
+        """
+        if isinstance(data, UploadedFile):
+            return ImageField.to_internal_value(self, data)
+        return super().to_internal_value(data)
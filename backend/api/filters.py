@@ -1,9 +1,27 @@
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 
 import django_filters as filters
 from django_filters import rest_framework as django_filters
 
-from recipes.models import Ingredients, Recipes
+from recipes.models import Ingredients, Recipes, Tags
+
+from .api_consts import TAG_SLUG_CHOICES_CACHE_KEY, TAGS_CACHE_TIMEOUT
+
+
+def get_tag_slug_choices():
+    """
+    Возвращает варианты выбора слагов тэгов.
+
+    Список кешируется: тэги меняются редко, а фильтр рецептов
+    создается на каждый запрос. Кеш сбрасывается сигналами
+    при изменении тэгов (см. api.signals).
+    """
+    return cache.get_or_set(
+        TAG_SLUG_CHOICES_CACHE_KEY,
+        lambda: list(Tags.objects.values_list("slug", "slug")),
+        TAGS_CACHE_TIMEOUT,
+    )
 
 
 class TagsMultipleChoiceField(filters.fields.MultipleChoiceField):
@@ -40,7 +58,27 @@ class TagsMultipleChoiceField(filters.fields.MultipleChoiceField):
                 )
 
 
-class TagsFilter(filters.AllValuesMultipleFilter):
+class TagSlugsFilter(filters.MultipleChoiceFilter):
+    """
+    Фильтр по слагам тэгов.
+
+    Варианты выбора берутся из кеша get_tag_slug_choices вместо
+    SELECT DISTINCT на каждый запрос, выбранные значения
+    применяются одним условием IN.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("choices", get_tag_slug_choices)
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        qs = self.get_method(qs)(**{f"{self.field_name}__in": value})
+        return qs.distinct() if self.distinct else qs
+
+
+class TagsFilter(TagSlugsFilter):
     """
     Фильтр для тегов.
 
@@ -99,9 +137,31 @@ class RecipeFilter(filters.FilterSet):
     is_favorited = filters.BooleanFilter(
         widget=filters.widgets.BooleanWidget(), label="В избранных."
     )
-    tags = filters.AllValuesMultipleFilter(field_name="tags__slug",
-                                           label="Ссылка")
+    tags = TagSlugsFilter(field_name="tags__slug", label="Ссылка")
 
     class Meta:
         model = Recipes
         fields = ["is_favorited", "is_in_shopping_cart", "author", "tags"]
+
+    def has_filter_params(self):
+        """
+        Проверяет, передан ли в запросе хотя бы один параметр фильтра.
+        """
+        return any(name in self.data for name in self.filters)
+
+    def is_valid(self):
+        """
+        Пропускает построение и валидацию формы, если параметров
+        фильтрации нет.
+        """
+        return not self.has_filter_params() or super().is_valid()
+
+    @property
+    def qs(self):
+        """
+        Возвращает queryset без изменений, если параметров
+        фильтрации нет.
+        """
+        if not self.has_filter_params():
+            return self.queryset.all()
+        return super().qs
@@ -0,0 +1,12 @@
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id с параметрами по рекомендации OWASP:
+    3 прохода, 64 МиБ памяти, 2 потока.
+    """
+
+    time_cost = 3
+    memory_cost = 65536
+    parallelism = 2
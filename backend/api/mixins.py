@@ -1,5 +1,8 @@
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from rest_framework import status
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 
 from recipes.models import Recipes
 from .permissions import IsAdminOrReadOnly
@@ -31,6 +34,57 @@ class GetObjectMixin:
         return recipe
 
 
+class UserRecipeRelationMixin(GetObjectMixin):
+    """
+    Миксин добавления рецепта в список пользователя и удаления из него.
+
+    Добавление выполняется одним INSERT ... ON CONFLICT DO NOTHING,
+    удаление одним DELETE без предварительной загрузки рецепта.
+
+    Поля:
+    - relation_model: Модель связи пользователя с рецептом
+    (избранное, корзина).
+    """
+
+    relation_model = None
+
+    def create(self, request, *args, **kwargs):
+        """
+        Добавляет рецепт в список пользователя.
+
+        Повторное добавление не считается ошибкой и не выполняет
+        отдельной проверки существования связи.
+
+        Возвращает:
+        - Response с сериализованными данными рецепта
+        и статусом HTTP 201 Created.
+        """
+        instance = self.get_object()
+        self.relation_model.objects.bulk_create(
+            [self.relation_model(user=request.user, recipe=instance)],
+            ignore_conflicts=True,
+        )
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        Удаляет рецепт из списка пользователя.
+
+        Исключения:
+        - Http404: Рецепта нет в списке пользователя.
+
+        Возвращает:
+        - Response со статусом HTTP 204 No Content.
+        """
+        deleted, _ = self.relation_model.objects.filter(
+            user=request.user, recipe_id=self.kwargs["recipe_id"]
+        ).delete()
+        if not deleted:
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class PermissionAndPaginationMixin:
     """
     Миксин для установки разрешений и типа пагинации.
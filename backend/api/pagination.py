@@ -1,4 +1,9 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class LimitPageNumberPagination(PageNumberPagination):
@@ -14,3 +19,107 @@ class LimitPageNumberPagination(PageNumberPagination):
 
     page_size = 6
     page_size_query_param = "limit"
+
+
+class CursorRecipePagination(CursorPagination):
+    """
+    Курсорная пагинация для ленты рецептов.
+
+    В отличие от LimitPageNumberPagination не выполняет COUNT(*) и
+    не использует OFFSET: следующая страница выбирается по индексу
+    первичного ключа.
+
+    Параметры:
+    - page_size: Количество элементов на странице по умолчанию.
+    - page_size_query_param: Параметр запроса для количества элементов.
+    - ordering: Поле сортировки (должно быть уникальным и индексированным).
+    - cursor_query_param: Параметр запроса с курсором.
+    """
+
+    page_size = 6
+    page_size_query_param = "limit"
+    ordering = "-id"
+    cursor_query_param = "cursor"
+
+    def decode_cursor(self, request):
+        """
+        Возвращает первую страницу для пустого параметра cursor.
+        """
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        return super().decode_cursor(request)
+
+
+class NoCountPagination(LimitPageNumberPagination):
+    """
+    Постраничная пагинация без подсчета общего количества объектов.
+
+    Вместо SELECT COUNT(*) выбирается на одну запись больше размера
+    страницы: по ней определяется, есть ли следующая страница.
+    В ответе остаются только next, previous и results.
+
+    Параметры:
+    - count_query_param: Параметр запроса, отключающий подсчет
+    (значения "0" или "false").
+    """
+
+    count_query_param = "count"
+    template = None
+
+    @classmethod
+    def is_requested(cls, request):
+        """
+        Проверяет, отказался ли клиент от общего количества объектов.
+        """
+        return request.query_params.get(cls.count_query_param) in (
+            "0", "false"
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        try:
+            page_number = int(
+                request.query_params.get(self.page_query_param, 1)
+            )
+        except ValueError:
+            page_number = 0
+        if page_number < 1:
+            raise NotFound()
+        offset = (page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.request = request
+        self.page_number = page_number
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.page_query_param, self.page_number + 1
+        )
+
+    def get_previous_link(self):
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.page_number - 1
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"].pop("count")
+        return response_schema
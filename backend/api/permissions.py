@@ -22,9 +22,9 @@ class IsAuthorOrAdminOrReadOnly(permissions.BasePermission):
         - bool: True, если пользователь имеет разрешение, иначе False.
         """
         return (
-            obj.author == request.user
-            or request.method in permissions.SAFE_METHODS
+            request.method in permissions.SAFE_METHODS
             or request.user.is_superuser
+            or obj.author_id == request.user.id
         )
 
 
@@ -1,22 +1,24 @@
 import django.contrib.auth.password_validation as validators
-from django.contrib.auth import authenticate
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from django.shortcuts import get_object_or_404
-from drf_extra_fields.fields import Base64ImageField
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare, salted_hmac
+from recipes.models import (Ingredients, RecipeIngredient, Recipes,
+                            Subscriptions, Tags)
 from rest_framework import serializers
 from rest_framework.serializers import (CharField, EmailField, Serializer,
                                         ValidationError)
 
-from recipes.models import (Ingredients, RecipeIngredient, Recipes,
-                            Subscriptions, Tags)
-
-from .api_consts import (ERROR_MESSAGE,
-                         INGREDIENT_ADD_ERROR,
-                         MAIL_PASSWORD_MISSING_MESSAGE,
-                         REPEAT_INGREDIENT_ERROR, WRONG_MAIL_PASSWORD_MESSAGE,
-                         MAX_VALUE_INGREDIENT, MIN_VALUE_INGREDIENT,
-                         MIN_VALUE_COOKING_TIME, MAX_VALUE_COOKING_TIME)
+from .api_consts import (ERROR_MESSAGE, INGREDIENT_ADD_ERROR,
+                         INGREDIENT_NOT_FOUND_ERROR, LOGIN_CACHE_KEY,
+                         LOGIN_CACHE_TIMEOUT, MAIL_PASSWORD_MISSING_MESSAGE,
+                         MAX_VALUE_COOKING_TIME, MAX_VALUE_INGREDIENT,
+                         MIN_VALUE_COOKING_TIME, MIN_VALUE_INGREDIENT,
+                         REPEAT_INGREDIENT_ERROR, SUBSCRIPTION_ANNOTATIONS,
+                         WRONG_MAIL_PASSWORD_MESSAGE)
+from .fields import Base64OrUploadedImageField
 
 
 class CustomUserLoginSerializer(Serializer):
@@ -44,22 +46,41 @@ class CustomUserLoginSerializer(Serializer):
         Возвращает:
         - Проверенные и обработанные данные.
 
+        Успешная проверка пароля кешируется на LOGIN_CACHE_TIMEOUT секунд,
+        чтобы повторные входы с теми же данными не вычисляли медленный
+        хеш заново. В кеше хранится get_session_auth_hash пользователя,
+        поэтому после смены пароля запись перестает подходить.
+        Неудачные попытки не кешируются.
+
         Вызывает исключение ValidationError, если поля некорректны.
         """
-        request = self.context.get("request", None)
-
         email = data.get("email", None)
         password = data.get("password", None)
         if email is None or password is None:
             raise ValidationError(MAIL_PASSWORD_MISSING_MESSAGE)
-        if not User.objects.filter(email=email).exists():
+        user = User.objects.only(
+            "id", "username", "password", "is_active"
+        ).filter(email=email).first()
+        if user is None:
+            # Хешируем пароль и для несуществующей почты, чтобы время
+            # ответа не выдавало, зарегистрирован ли такой адрес.
+            make_password(password)
             raise ValidationError(WRONG_MAIL_PASSWORD_MESSAGE)
-        user = get_object_or_404(User, email=email)
-        username = user.username
-        user = authenticate(request=request,
-                            username=username,
-                            password=password)
-        if not user:
+        cache_key = LOGIN_CACHE_KEY.format(
+            digest=salted_hmac(
+                LOGIN_CACHE_KEY, f"{email}:{password}", algorithm="sha256"
+            ).hexdigest()
+        )
+        cached_hash = cache.get(cache_key)
+        if cached_hash is None or not constant_time_compare(
+            cached_hash, user.get_session_auth_hash()
+        ):
+            if not user.check_password(password):
+                raise ValidationError(WRONG_MAIL_PASSWORD_MESSAGE)
+            cache.set(
+                cache_key, user.get_session_auth_hash(), LOGIN_CACHE_TIMEOUT
+            )
+        if not user.is_active:
             raise ValidationError(WRONG_MAIL_PASSWORD_MESSAGE)
         data["user"] = user
         return data
@@ -80,10 +101,16 @@ class GetIsSubscribedMixin:
         Параметры:
         - obj: Объект пользователя, на которого проверяется подписка.
 
+        Если представление положило в контекст множество
+        followed_author_ids, проверка выполняется без запросов к БД.
+
         Возвращает:
         - True, если текущий пользователь подписан на объект пользователя,
           иначе False.
         """
+        followed_author_ids = self.context.get("followed_author_ids")
+        if followed_author_ids is not None:
+            return obj.id in followed_author_ids
         user = self.context["request"].user
         return (
             user.follower.filter(author=obj).exists()
@@ -92,12 +119,13 @@ class GetIsSubscribedMixin:
         )
 
 
-class UserListSerializer(GetIsSubscribedMixin, serializers.ModelSerializer):
+class UserListSerializer(serializers.ModelSerializer):
     """
     Сериализатор списка пользователей с информацией о подписке.
 
     Поля:
     - is_subscribed: Поле, указывающее наличие подписки на пользователя.
+      Берется из аннотации queryset (см. UsersViewSet.get_queryset).
 
     Мета-класс:
     - model: Модель User.
@@ -141,6 +169,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
             "last_name",
             "password",
         )
+        extra_kwargs = {"password": {"write_only": True}}
 
     def validate_password(self, password):
         """
@@ -155,6 +184,19 @@ class UserCreateSerializer(serializers.ModelSerializer):
         validators.validate_password(password)
         return password
 
+    def create(self, validated_data):
+        """
+        Создает пользователя, хешируя пароль ровно один раз.
+
+        Параметры:
+        - validated_data: Проверенные данные пользователя.
+
+        Возвращает:
+        - Созданный объект пользователя.
+        """
+        validated_data["password"] = make_password(validated_data["password"])
+        return super().create(validated_data)
+
 
 class UserPasswordSerializer(serializers.Serializer):
     """
@@ -182,7 +224,7 @@ class UserPasswordSerializer(serializers.Serializer):
         - serializers.ValidationError, если текущий пароль неверен.
         """
         user = self.context["request"].user
-        if not authenticate(username=user.email, password=current_password):
+        if not user.check_password(current_password):
             raise serializers.ValidationError(ERROR_MESSAGE,
                                               code="authorization")
         return current_password
@@ -216,7 +258,7 @@ class UserPasswordSerializer(serializers.Serializer):
         user = self.context["request"].user
         password = make_password(validated_data.get("new_password"))
         user.password = password
-        user.save()
+        user.save(update_fields=["password"])
         return validated_data
 
 
@@ -337,7 +379,8 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     Сериализатор для создания и обновления рецепта.
 
     Поля:
-    - image: Изображение рецепта (в формате Base64).
+    - image: Изображение рецепта (в формате Base64 или файлом
+      в multipart/form-data).
     - tags: Список связанных тэгов.
     - ingredients: Список ингредиентов.
 
@@ -347,7 +390,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     - read_only_fields: Поля только для чтения.
     """
 
-    image = Base64ImageField(max_length=None, use_url=True)
+    image = Base64OrUploadedImageField(max_length=None, use_url=True)
     tags = serializers.PrimaryKeyRelatedField(
         many=True,
         queryset=Tags.objects.all()
@@ -359,7 +402,17 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipes
-        fields = "__all__"
+        fields = (
+            "id",
+            "tags",
+            "author",
+            "ingredients",
+            "name",
+            "image",
+            "text",
+            "cooking_time",
+            "pub_date",
+        )
         read_only_fields = ("author",)
 
     def validate(self, data):
@@ -375,23 +428,21 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         Генерирует:
         - serializers.ValidationError, если данные невалидны.
         """
-        ingredients = data["ingredients"]
-        ingredient_list = []
-        for items in ingredients:
-            ingredient = get_object_or_404(Ingredients, id=items["id"])
-            if ingredient in ingredient_list:
-                raise serializers.ValidationError(
-                    REPEAT_INGREDIENT_ERROR
-                )
-            ingredient_list.append(ingredient)
+        ingredient_ids = [items["id"] for items in data["ingredients"]]
+        unique_ids = set(ingredient_ids)
+        if len(unique_ids) != len(ingredient_ids):
+            raise serializers.ValidationError(
+                REPEAT_INGREDIENT_ERROR
+            )
+        if unique_ids - set(
+            Ingredients.objects.filter(id__in=unique_ids).values_list(
+                "id", flat=True
+            )
+        ):
+            raise serializers.ValidationError(INGREDIENT_NOT_FOUND_ERROR)
         tags = data["tags"]
         if not tags:
             raise serializers.ValidationError("Добавьте тэг для рецепта")
-        for tag_name in tags:
-            if not Tags.objects.filter(name=tag_name).exists():
-                raise serializers.ValidationError(
-                    f"Тэга {tag_name} не существует"
-                )
         return data
 
     def validate_ingredients(self, ingredients):
@@ -421,18 +472,19 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         - ingredients: Список ингредиентов рецепта.
         - recipe: Объект рецепта.
         """
-        recipe_ingredient_list = []
-
-        for ingredient in ingredients:
-            recipe_ingredient = RecipeIngredient(
-                recipe=recipe,
-                ingredient_id=ingredient.get("id"),
-                amount=ingredient.get("amount"),
-            )
-        recipe_ingredient_list.append(recipe_ingredient)
-
-        RecipeIngredient.objects.bulk_create(recipe_ingredient_list)
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient_id=ingredient["id"],
+                    amount=ingredient["amount"],
+                )
+                for ingredient in ingredients
+            ],
+            batch_size=settings.BULK_CREATE_BATCH_SIZE,
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         """
         Создает новый рецепт.
@@ -450,6 +502,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         self.create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """
         Обновляет существующий рецепт.
@@ -463,7 +516,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         """
         if "ingredients" in validated_data:
             ingredients = validated_data.pop("ingredients")
-            instance.ingredients.clear()
+            RecipeIngredient.objects.filter(recipe=instance).delete()
             self.create_ingredients(ingredients, instance)
         if "tags" in validated_data:
             instance.tags.set(validated_data.pop("tags"))
@@ -514,7 +567,19 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipes
-        fields = "__all__"
+        fields = (
+            "id",
+            "tags",
+            "author",
+            "ingredients",
+            "is_favorited",
+            "is_in_shopping_cart",
+            "name",
+            "image",
+            "text",
+            "cooking_time",
+            "pub_date",
+        )
 
     def get_image_url(self, obj):
         if obj.image:
@@ -557,6 +622,10 @@ class SubscribeSerializer(serializers.ModelSerializer):
     другого пользователя.
     - recipes_count: Количество рецептов пользователя.
 
+    Поля is_subscribed и recipes_count не вычисляются сериализатором:
+    объекты обязаны приходить из get_subscriptions_queryset
+    с соответствующими аннотациями (в режиме DEBUG это проверяется).
+
     Метаданные:
     - model: Ссылка на модель Subscriptions.
     - fields: Поля, которые будут сериализованы.
@@ -584,21 +653,17 @@ class SubscribeSerializer(serializers.ModelSerializer):
             "recipes_count",
         )
 
-    def create(self, validated_data):
-        # Проверка на подписку на себя
-        request = self.context.get("request")
-        if request.user.id == validated_data["author"].id:
-            raise serializers.ValidationError("Нельзя подписаться на себя")
-
-        # Проверка на уже существующую подписку
-        if request.user.follower.filter(
-            author=validated_data["author"]
-        ).exists():
-            raise serializers.ValidationError(
-                "Вы уже подписаны на этого автора"
+    def to_representation(self, instance):
+        if settings.DEBUG:
+            missing = [
+                name for name in SUBSCRIPTION_ANNOTATIONS
+                if not hasattr(instance, name)
+            ]
+            assert not missing, (
+                f"Подписка не аннотирована полями {missing}, "
+                "используйте get_subscriptions_queryset."
             )
-
-        return super().create(validated_data)
+        return super().to_representation(instance)
 
     def get_recipes(self, obj):
         """
@@ -611,10 +676,10 @@ class SubscribeSerializer(serializers.ModelSerializer):
         Возвращает:
         - Список рецептов пользователя.
         """
-        request = self.context.get("request")
-        limit = request.GET.get("recipes_limit")
-        recipes = (
-            obj.author.recipe.all()[: int(limit)]
-            if limit else obj.author.recipe.all()
-        )
+        limit = self.context.get("recipes_limit")
+        recipes = getattr(obj.author, "prefetched_recipes", None)
+        if recipes is None:
+            recipes = obj.author.recipe.all()
+        if limit is not None:
+            recipes = recipes[:limit]
         return SubscribeRecipeSerializer(recipes, many=True).data
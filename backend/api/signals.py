@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import Ingredients, Recipes, Subscriptions, Tags
+from recipes.signals import bulk_loaded
+from rest_framework.authtoken.models import Token
+
+from .api_consts import (AUTHOR_CACHE_VERSION_KEY,
+                         INGREDIENTS_CACHE_VERSION_KEY,
+                         SUBSCRIPTIONS_CACHE_VERSION_KEY,
+                         TAG_SLUG_CHOICES_CACHE_KEY, TAGS_LIST_CACHE_KEY,
+                         TOKEN_CACHE_KEY)
+from .cache_versions import bump_cache_version
+
+
+def bump_author_cache_version(author_id):
+    """
+    Делает недействительными закешированные страницы подписок,
+    на которых выводится автор, увеличивая версию его кеша.
+
+    Параметры:
+    - author_id: Идентификатор автора.
+    """
+    bump_cache_version(AUTHOR_CACHE_VERSION_KEY.format(author_id=author_id))
+
+
+@receiver((post_save, post_delete, bulk_loaded), sender=Tags)
+def clear_tags_cache(**kwargs):
+    """
+    Сбрасывает кеш тэгов при изменении тэгов.
+
+    После массовой загрузки, которая post_save не отправляет,
+    вызывается по сигналу bulk_loaded (см. команду load_tags).
+    """
+    cache.delete_many((TAG_SLUG_CHOICES_CACHE_KEY, TAGS_LIST_CACHE_KEY))
+
+
+@receiver((post_save, post_delete, bulk_loaded), sender=Ingredients)
+def clear_ingredients_cache(**kwargs):
+    """
+    Делает недействительными закешированные списки ингредиентов,
+    увеличивая версию их кеша.
+
+    После массовой загрузки, которая post_save не отправляет,
+    вызывается по сигналу bulk_loaded (см. команду load_db_ingredients).
+    """
+    bump_cache_version(INGREDIENTS_CACHE_VERSION_KEY)
+
+
+@receiver((post_save, post_delete), sender=Subscriptions)
+def clear_subscriptions_cache(instance, **kwargs):
+    """Сбрасывает кеш подписок пользователя при изменении его подписок."""
+    bump_cache_version(
+        SUBSCRIPTIONS_CACHE_VERSION_KEY.format(user_id=instance.user_id)
+    )
+
+
+@receiver((post_save, post_delete), sender=Recipes)
+def clear_author_cache(instance, **kwargs):
+    """Сбрасывает кеш подписок на автора изменившегося рецепта."""
+    bump_author_cache_version(instance.author_id)
+
+
+@receiver((post_save, post_delete), sender=Token)
+def clear_token_cache(instance, **kwargs):
+    """Сбрасывает кеш аутентификации при изменении или удалении токена."""
+    cache.delete(TOKEN_CACHE_KEY.format(key=instance.key))
+
+
+@receiver(post_save, sender=User)
+def clear_user_tokens_cache(instance, created, **kwargs):
+    """
+    Сбрасывает кеш аутентификации пользователя после изменения его данных,
+    например пароля или флага is_active, и кеш подписок на него.
+
+    Токены пользователя выбираются из БД, только если кеширование
+    аутентификации включено (настройка CACHE_TOKEN_AUTH).
+    """
+    if created:
+        return
+    bump_author_cache_version(instance.pk)
+    if not settings.CACHE_TOKEN_AUTH:
+        return
+    cache.delete_many([
+        TOKEN_CACHE_KEY.format(key=key)
+        for key in Token.objects.filter(user=instance).values_list(
+            "key", flat=True
+        )
+    ])
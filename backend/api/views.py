@@ -1,16 +1,23 @@
-from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.contrib.postgres.aggregates import StringAgg
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import (BooleanField, CharField, ExpressionWrapper, F,
+                              FilteredRelation, IntegerField, Q, Window)
 from django.db.models.aggregates import Count, Sum
-from django.db.models.expressions import Exists, OuterRef, Value
-from django.http import HttpResponse
+from django.db.models.expressions import Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, RowNumber
+from django.db.models.query import Prefetch
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
-from recipes.models import (FavoriteRecipe, Ingredients, Recipes, ShoppingCart,
-                            Subscriptions, Tags)
+from recipes.models import (FavoriteRecipe, Ingredients, RecipeIngredient,
+                            Recipes, ShoppingCart, Subscriptions, Tags)
 from rest_framework import generics, status, viewsets
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (SAFE_METHODS, AllowAny,
                                         IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
@@ -18,7 +25,17 @@ from rest_framework.response import Response
 
 from api.filters import IngredientFilter, RecipeFilter
 
-from .mixins import GetObjectMixin, PermissionAndPaginationMixin
+from .api_consts import (ALREADY_SUBSCRIBED_ERROR, AUTHOR_CACHE_VERSION_KEY,
+                         INGREDIENTS_CACHE_TIMEOUT,
+                         INGREDIENTS_CACHE_VERSION_KEY,
+                         INGREDIENTS_LIST_CACHE_KEY, SELF_SUBSCRIPTION_ERROR,
+                         SUBSCRIPTIONS_CACHE_TIMEOUT,
+                         SUBSCRIPTIONS_CACHE_VERSION_KEY,
+                         SUBSCRIPTIONS_LIST_CACHE_KEY, TAGS_CACHE_TIMEOUT,
+                         TAGS_LIST_CACHE_KEY)
+from .cache_versions import get_cache_version, get_cache_versions
+from .mixins import PermissionAndPaginationMixin, UserRecipeRelationMixin
+from .pagination import CursorRecipePagination, NoCountPagination
 from .serializers import (CustomUserLoginSerializer, IngredientSerializer,
                           RecipeReadSerializer, RecipeWriteSerializer,
                           SubscribeSerializer, TagSerializer,
@@ -26,6 +43,113 @@ from .serializers import (CustomUserLoginSerializer, IngredientSerializer,
                           UserPasswordSerializer)
 
 
+def get_subscriptions_queryset(user):
+    """
+    Возвращает подписки пользователя вместе с рецептами авторов.
+
+    Рецепты всех авторов страницы загружаются одним запросом в атрибут
+    prefetched_recipes, количество рецептов и флаг подписки задаются
+    аннотациями recipes_count и is_subscribed, которых ожидает
+    SubscribeSerializer. Количество рецептов считается коррелированным
+    подзапросом, чтобы основной запрос обходился без JOIN и GROUP BY.
+    """
+    recipes_count = (
+        Recipes.objects.filter(author=OuterRef("author"))
+        .order_by()
+        .values("author")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    return (
+        Subscriptions.objects.filter(user=user)
+        .select_related("author")
+        .prefetch_related(
+            Prefetch(
+                "author__recipe",
+                queryset=Recipes.objects.only(
+                    "id", "author", "name", "image", "cooking_time"
+                ).order_by("-id"),
+                to_attr="prefetched_recipes",
+            )
+        )
+        .annotate(
+            recipes_count=Coalesce(
+                Subquery(recipes_count, output_field=IntegerField()), 0
+            ),
+            is_subscribed=Value(True, output_field=BooleanField()),
+        )
+        .order_by("-id")
+    )
+
+
+def annotate_recipe_flags(queryset, user):
+    """
+    Добавляет к рецептам аннотации is_favorited и is_in_shopping_cart.
+
+    Для аутентифицированного пользователя флаги вычисляются
+    LEFT JOIN по его избранному и корзине, для анонимного
+    подставляется константа False.
+    """
+    if not user.is_authenticated:
+        return queryset.annotate(
+            is_in_shopping_cart=Value(False),
+            is_favorited=Value(False),
+        )
+    return queryset.annotate(
+        user_favorite=FilteredRelation(
+            "favorite_recipe",
+            condition=Q(favorite_recipe__user=user),
+        ),
+        user_shopping_cart=FilteredRelation(
+            "shopping_cart",
+            condition=Q(shopping_cart__user=user),
+        ),
+    ).annotate(
+        is_favorited=ExpressionWrapper(
+            Q(user_favorite__isnull=False),
+            output_field=BooleanField(),
+        ),
+        is_in_shopping_cart=ExpressionWrapper(
+            Q(user_shopping_cart__isnull=False),
+            output_field=BooleanField(),
+        ),
+    )
+
+
+def with_recipe_relations(queryset):
+    """
+    Подгружает автора, тэги и ингредиенты рецептов, которые выводит
+    RecipeReadSerializer, фиксированным числом запросов.
+    """
+    return queryset.select_related("author").prefetch_related(
+        Prefetch(
+            "tags",
+            queryset=Tags.objects.only("id", "name", "color", "slug"),
+        ),
+        Prefetch(
+            "recipe",
+            queryset=RecipeIngredient.objects.select_related(
+                "ingredient"
+            ).only(
+                "recipe",
+                "amount",
+                "ingredient__id",
+                "ingredient__name",
+                "ingredient__measurement_unit",
+            ),
+        ),
+    )
+
+
+def get_recipes_limit(request):
+    """
+    Возвращает значение параметра recipes_limit или None,
+    если параметр не передан или не является числом.
+    """
+    limit = request.query_params.get("recipes_limit", "")
+    return int(limit) if limit.isdigit() else None
+
+
 class GetToken(ObtainAuthToken):
     """
     Класс для получения токена авторизации.
@@ -79,20 +203,30 @@ class UsersViewSet(UserViewSet):
         Если пользователь не аутентифицирован,
         возвращает только список пользователей.
 
+        При чтении из базы выбираются только поля, которые отдает
+        UserListSerializer, без пароля и служебных дат.
+
         Возвращает:
             - QuerySet: Список пользователей с информацией о подписках.
 
         HTTP метод: GET
         """
-        return (
+        queryset = (
             User.objects.annotate(
                 is_subscribed=Exists(
-                    self.request.user.follower.filter(author=OuterRef("id"))
+                    Subscriptions.objects.filter(
+                        user=self.request.user, author=OuterRef("pk")
+                    )
                 )
-            ).prefetch_related("follower", "following")
+            )
             if self.request.user.is_authenticated
             else User.objects.annotate(is_subscribed=Value(False))
         )
+        if self.request.method in SAFE_METHODS:
+            queryset = queryset.only(
+                "id", "email", "username", "first_name", "last_name"
+            )
+        return queryset
 
     def get_serializer_class(self):
         """
@@ -107,21 +241,6 @@ class UsersViewSet(UserViewSet):
             return UserCreateSerializer
         return UserListSerializer
 
-    def perform_create(self, serializer):
-        """
-        Создает нового пользователя.
-
-        Создает нового пользователя на основе данных, полученных из запроса.
-        Хеширует пароль перед сохранением.
-
-        Параметры запроса:
-            - password (строка): Пароль пользователя.
-
-        HTTP метод: POST
-        """
-        password = make_password(self.request.data["password"])
-        serializer.save(password=password)
-
     @action(detail=False, permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
         """
@@ -130,17 +249,49 @@ class UsersViewSet(UserViewSet):
         Получает список подписок для текущего аутентифицированного пользователя
         и возвращает его в ответе.
 
+        Ответ кешируется для каждого пользователя и строки запроса. В ключ
+        входит версия кеша подписок пользователя, которую сигналы
+        увеличивают при изменении его подписок. Вместе с ответом
+        сохраняются версии кеша авторов страницы: если рецепты или
+        данные одного из них изменились, ответ строится заново.
+
         Возвращает:
             - Response: Список подписок текущего пользователя.
 
         HTTP метод: GET
         """
-        user = request.user
-        queryset = Subscriptions.objects.filter(user=user)
+        user_id = request.user.id
+        cache_key = SUBSCRIPTIONS_LIST_CACHE_KEY.format(
+            user_id=user_id,
+            version=get_cache_version(
+                SUBSCRIPTIONS_CACHE_VERSION_KEY.format(user_id=user_id)
+            ),
+            query=request.query_params.urlencode(),
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            data, author_versions = cached
+            if get_cache_versions(list(author_versions)) == author_versions:
+                return Response(data)
+        queryset = get_subscriptions_queryset(request.user)
         pages = self.paginate_queryset(queryset)
-        serializer = SubscribeSerializer(pages, many=True,
-                                         context={"request": request})
-        return self.get_paginated_response(serializer.data)
+        author_versions = get_cache_versions([
+            AUTHOR_CACHE_VERSION_KEY.format(author_id=subscription.author_id)
+            for subscription in pages
+        ])
+        serializer = SubscribeSerializer(
+            pages,
+            many=True,
+            context={
+                "request": request,
+                "recipes_limit": get_recipes_limit(request),
+            },
+        )
+        data = self.get_paginated_response(serializer.data).data
+        cache.set(
+            cache_key, (data, author_versions), SUBSCRIPTIONS_CACHE_TIMEOUT
+        )
+        return Response(data)
 
 
 @api_view(["post"])
@@ -201,14 +352,15 @@ class AddDeleteSubscription(
 
         :return: QuerySet авторов с дополнительной информацией.
         """
-        return (
-            self.request.user.follower.select_related("following")
-            .prefetch_related("following__recipe")
-            .annotate(
-                recipes_count=Count("following__recipe"),
-                is_subscribed=Value(True),
-            )
-        )
+        return get_subscriptions_queryset(self.request.user)
+
+    def get_serializer_context(self):
+        """
+        Добавляет в контекст разобранный параметр recipes_limit.
+        """
+        context = super().get_serializer_context()
+        context["recipes_limit"] = get_recipes_limit(self.request)
+        return context
 
     def get_object(self):
         """
@@ -225,99 +377,74 @@ class AddDeleteSubscription(
         """
         Создает подписку на автора.
 
+        Повторную подписку и несуществующего автора отсекают
+        ограничения БД, без отдельных запросов на проверку.
+
         :param request: Запрос пользователя.
         :return: Ответ с данными о созданной подписке.
         """
-        instance = self.get_object()
-        subscription = request.user.follower.create(author=instance)
+        author_id = self.kwargs["user_id"]
+        if author_id == request.user.id:
+            raise ValidationError(SELF_SUBSCRIPTION_ERROR)
+        try:
+            with transaction.atomic():
+                Subscriptions.objects.create(
+                    user=request.user, author_id=author_id
+                )
+        except IntegrityError:
+            if not User.objects.filter(id=author_id).exists():
+                raise Http404
+            raise ValidationError(ALREADY_SUBSCRIBED_ERROR)
+        subscription = self.get_queryset().get(author_id=author_id)
         serializer = self.get_serializer(subscription)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def perform_destroy(self, instance):
+    def destroy(self, request, *args, **kwargs):
         """
-        Отменяет подписку на автора.
+        Отменяет подписку на автора одним запросом DELETE,
+        без предварительной загрузки автора.
 
-        :param instance: Объект автора.
-        :return: None
+        :param request: Запрос пользователя.
+        :return: Ответ со статусом 204 или 404, если подписки не было.
         """
-        self.request.user.follower.filter(author=instance).delete()
+        deleted, _ = request.user.follower.filter(
+            author_id=self.kwargs["user_id"]
+        ).delete()
+        if not deleted:
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class AddDeleteFavoriteRecipe(
-    GetObjectMixin, generics.RetrieveDestroyAPIView, generics.ListCreateAPIView
+    UserRecipeRelationMixin,
+    generics.RetrieveDestroyAPIView,
+    generics.ListCreateAPIView,
 ):
     """
     Представление для добавления и удаления рецепта в/из избранных.
 
     Методы:
     - create: Добавляет рецепт в избранные пользователя.
-    - perform_destroy: Удаляет рецепт из избранных пользователя.
+    - destroy: Удаляет рецепт из избранных пользователя.
     """
 
-    def create(self, request, *args, **kwargs):
-        """
-        Добавляет рецепт в избранные пользователя.
-
-        Параметры:
-        - request: Объект запроса.
-        Возвращает:
-        - Response с сериализованными данными рецепта
-        и статусом HTTP 201 Created.
-        """
-        instance = self.get_object()
-        request.user.favorite_recipe.recipe.add(instance)
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-    def perform_destroy(self, instance):
-        """
-        Удаляет рецепт из избранных пользователя.
-
-        Параметры:
-        - instance: Объект рецепта, который нужно удалить.
-
-        Не возвращает значения.
-        """
-        self.request.user.favorite_recipe.recipe.remove(instance)
+    relation_model = FavoriteRecipe
 
 
 class AddDeleteShoppingCart(
-    GetObjectMixin, generics.RetrieveDestroyAPIView, generics.ListCreateAPIView
+    UserRecipeRelationMixin,
+    generics.RetrieveDestroyAPIView,
+    generics.ListCreateAPIView,
 ):
     """
     Представление для добавления и удаления рецепта в корзину/из корзины.
 
     Методы:
     - create: Добавляет рецепт в корзину пользователя.
-    - perform_destroy: Удаляет рецепт из корзины пользователя.
+    - destroy: Удаляет рецепт из корзины пользователя.
     """
 
-    def create(self, request, *args, **kwargs):
-        """
-        Добавляет рецепт в корзину пользователя.
-
-        Параметры:
-        - request: Объект запроса.
-
-        Возвращает:
-        - Response с сериализованными данными рецепта и
-        статусом HTTP 201 Created.
-        """
-        instance = self.get_object()
-        request.user.shopping_cart.recipe.add(instance)
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-    def perform_destroy(self, instance):
-        """
-        Удаляет рецепт из корзины пользователя.
-
-        Параметры:
-        - instance: Объект рецепта, который нужно удалить из корзины.
-
-        Не возвращает значения.
-        """
-        self.request.user.shopping_cart.recipe.remove(instance)
+    relation_model = ShoppingCart
 
 
 class RecipesViewSet(viewsets.ModelViewSet):
@@ -339,11 +466,44 @@ class RecipesViewSet(viewsets.ModelViewSet):
     filterset_class = RecipeFilter
     permission_classes = (IsAuthenticatedOrReadOnly,)
 
+    @property
+    def paginator(self):
+        """
+        Переключает ленту на курсорную пагинацию, если клиент передал
+        параметр cursor, или на пагинацию без COUNT(*), если клиент
+        передал count=false; иначе используется постраничная пагинация.
+        """
+        if not hasattr(self, "_paginator"):
+            if (
+                CursorRecipePagination.cursor_query_param
+                in self.request.query_params
+            ):
+                self.pagination_class = CursorRecipePagination
+            elif NoCountPagination.is_requested(self.request):
+                self.pagination_class = NoCountPagination
+        return super().paginator
+
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def get_serializer_context(self):
+        """
+        Добавляет в контекст множество id авторов, на которых подписан
+        текущий пользователь, чтобы is_subscribed считался без запросов
+        для каждого рецепта.
+        """
+        context = super().get_serializer_context()
+        if self.request.method in SAFE_METHODS:
+            user = self.request.user
+            context["followed_author_ids"] = (
+                set(user.follower.values_list("author_id", flat=True))
+                if user.is_authenticated
+                else frozenset()
+            )
+        return context
+
     def get_queryset(self):
         """
         Получение списка рецептов с аннотациями информации о рецепте.
@@ -363,46 +523,26 @@ class RecipesViewSet(viewsets.ModelViewSet):
         от статуса аутентификации пользователя.
         """
         author_id = self.kwargs.get('author_id')
-        queryset = Recipes.objects.all()
-
         if author_id:
-            queryset = queryset.filter(author_id=author_id)
-            return queryset
-        return (
-            Recipes.objects.annotate(
-                is_favorited=Exists(
-                    FavoriteRecipe.objects.filter(
-                        user=self.request.user, recipe=OuterRef("id")
-                    )
-                ),
-                is_in_shopping_cart=Exists(
-                    ShoppingCart.objects.filter(
-                        user=self.request.user, recipe=OuterRef("id")
-                    )
-                ),
-            )
-            .select_related("author")
-            .prefetch_related(
-                "tags",
-                "ingredients",
-                "recipe",
-                "shopping_cart",
-                "favorite_recipe",
-            )
-            if self.request.user.is_authenticated
-            else Recipes.objects.annotate(
-                is_in_shopping_cart=Value(False),
-                is_favorited=Value(False),
-            )
-            .select_related("author")
-            .prefetch_related(
-                "tags",
-                "ingredients",
-                "recipe",
-                "shopping_cart",
-                "favorite_recipe",
-            )
+            return Recipes.objects.filter(author_id=author_id)
+        queryset = with_recipe_relations(
+            annotate_recipe_flags(Recipes.objects.all(), self.request.user)
         )
+        if self.request.method in SAFE_METHODS:
+            queryset = queryset.only(
+                "id",
+                "name",
+                "image",
+                "text",
+                "cooking_time",
+                "pub_date",
+                "author__id",
+                "author__email",
+                "author__username",
+                "author__first_name",
+                "author__last_name",
+            )
+        return queryset
 
     def perform_create(self, serializer):
         """
@@ -427,27 +567,41 @@ class RecipesViewSet(viewsets.ModelViewSet):
         Возвращает:
         - HttpResponse с текстовым файлом списка покупок пользователя.
         """
-        shopping_cart = (
-            request.user.shopping_cart.recipe.values(
-                "ingredients__name", "ingredients__measurement_unit"
+        shopping_list = (
+            RecipeIngredient.objects.filter(
+                recipe__shopping_cart__user=request.user
+            )
+            .values("ingredient__name", "ingredient__measurement_unit")
+            .annotate(amount=Sum("amount"))
+            .annotate(
+                line=Concat(
+                    Window(RowNumber(), order_by=F("ingredient__name").asc()),
+                    Value(". "),
+                    F("ingredient__name"),
+                    Value(" - "),
+                    F("amount"),
+                    Value(" "),
+                    F("ingredient__measurement_unit"),
+                    Value("."),
+                    output_field=CharField(),
+                )
             )
-            .annotate(amount=Sum("recipe__amount"))
             .order_by()
-        )
-
-        if shopping_cart:
-            shopping_list = ["Ваш список покупок:"]
-            for index, recipe in enumerate(shopping_cart, start=1):
-                shopping_list.append(
-                    f'{index}. {recipe["ingredients__name"]} - '
-                    f'{recipe["amount"]} '
-                    f'{recipe["ingredients__measurement_unit"]}.'
+            .aggregate(
+                text=StringAgg(
+                    "line", delimiter="\n", ordering="ingredient__name"
                 )
+            )["text"]
+        )
 
-            response = HttpResponse("\n".join(shopping_list),
-                                    content_type="text/plain")
-            response["Content-Disposition"] = 'attachment;'
-            'filename="shopping_list.txt"'
+        if shopping_list:
+            response = HttpResponse(
+                f"Ваш список покупок:\n{shopping_list}",
+                content_type="text/plain",
+            )
+            response["Content-Disposition"] = (
+                'attachment; filename="shopping_list.txt"'
+            )
             return response
 
         return HttpResponse("Список покупок пуст", content_type="text/plain")
@@ -468,6 +622,22 @@ class TagsViewSet(PermissionAndPaginationMixin, viewsets.ModelViewSet):
     queryset = Tags.objects.all()
     serializer_class = TagSerializer
 
+    def list(self, request, *args, **kwargs):
+        """
+        Возвращает список тэгов.
+
+        Тэги меняются редко, поэтому список строится через values()
+        без создания моделей и сериализатора и хранится в кеше,
+        который сбрасывается сигналами при изменении тэгов.
+        """
+        return Response(cache.get_or_set(
+            TAGS_LIST_CACHE_KEY,
+            lambda: list(
+                self.get_queryset().values("id", "name", "color", "slug")
+            ),
+            TAGS_CACHE_TIMEOUT,
+        ))
+
 
 class IngredientsViewSet(PermissionAndPaginationMixin, viewsets.ModelViewSet):
     """
@@ -485,3 +655,22 @@ class IngredientsViewSet(PermissionAndPaginationMixin, viewsets.ModelViewSet):
     queryset = Ingredients.objects.all()
     serializer_class = IngredientSerializer
     filterset_class = IngredientFilter
+
+    def list(self, request, *args, **kwargs):
+        """
+        Возвращает список ингредиентов с учетом фильтра по имени.
+
+        Ответ кешируется отдельно для каждой строки запроса. В ключ
+        входит версия кеша ингредиентов, которую сигналы увеличивают
+        при изменении ингредиентов, так что старые ответы перестают
+        использоваться.
+        """
+        cache_key = INGREDIENTS_LIST_CACHE_KEY.format(
+            version=get_cache_version(INGREDIENTS_CACHE_VERSION_KEY),
+            query=request.query_params.urlencode(),
+        )
+        data = cache.get(cache_key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(cache_key, data, INGREDIENTS_CACHE_TIMEOUT)
+        return Response(data)
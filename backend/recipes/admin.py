@@ -1,20 +1,66 @@
 from django.contrib import admin
-from django.utils.safestring import mark_safe
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, Prefetch
+from django.db.models.functions import Left
+from django.utils.html import format_html
 
 from .models import (FavoriteRecipe, Ingredients, RecipeIngredient, Recipes,
                      RecipesTags, ShoppingCart, Subscriptions, Tags)
-from .recipes_consts import EMPTY_MESSAGE, RECIPE_DISPLAY_LIMIT
+from .paginator import EstimatedCountPaginator
+from .recipes_consts import (ADMIN_THUMBNAIL_SIZE, EMPTY_MESSAGE,
+                             TEXT_PREVIEW_LENGTH, TOP_AUTHORS_CACHE_KEY,
+                             TOP_AUTHORS_CACHE_TIMEOUT, TOP_AUTHORS_LIMIT)
+from .thumbnails import get_thumbnail_url
+
+
+class TopAuthorsFilter(admin.SimpleListFilter):
+    """
+    Фильтр рецептов по самым активным авторам.
+
+    Список авторов с наибольшим числом рецептов кешируется, поэтому
+    боковая панель не выполняет SELECT DISTINCT по всем рецептам
+    при каждой загрузке страницы.
+    """
+
+    title = "Автор"
+    parameter_name = "author"
+
+    def lookups(self, request, model_admin):
+        return cache.get_or_set(
+            TOP_AUTHORS_CACHE_KEY,
+            lambda: list(
+                User.objects.annotate(recipes_count=Count("recipe"))
+                .filter(recipes_count__gt=0)
+                .order_by("-recipes_count")
+                .values_list("id", "username")[:TOP_AUTHORS_LIMIT]
+            ),
+            TOP_AUTHORS_CACHE_TIMEOUT,
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            return queryset.filter(author_id=self.value())
+        return queryset
 
 
 class RecipeIngredientAdmin(admin.StackedInline):
     model = RecipeIngredient
     autocomplete_fields = ("ingredient",)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            "recipe", "ingredient"
+        )
+
 
 class RecipeTagsAdmin(admin.StackedInline):
     model = RecipesTags
     autocomplete_fields = ("tag",)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("recipe", "tag")
+
 
 @admin.register(Recipes)
 class RecipeAdmin(admin.ModelAdmin):
@@ -23,7 +69,7 @@ class RecipeAdmin(admin.ModelAdmin):
         "get_author_username",
         "get_author_email",
         "name",
-        "short_description",
+        "get_short_text",
         "cooking_time",
         "get_tags",
         "get_ingredients",
@@ -34,7 +80,7 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display_links = (
         "get_author_email",
         "get_author_username",
-        "short_description",
+        "get_short_text",
     )
     search_fields = (
         "name",
@@ -43,16 +89,68 @@ class RecipeAdmin(admin.ModelAdmin):
         "author__first_name",
         "ingredients__name",
     )
-    list_filter = ("author__username", "name", "tags")
+    list_filter = (TopAuthorsFilter, "tags")
+    autocomplete_fields = ("author",)
     inlines = (RecipeIngredientAdmin, RecipeTagsAdmin)
     empty_value_display = EMPTY_MESSAGE
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def get_queryset(self, request):
+        """
+        Ограничивает выборку полями и аннотациями списка рецептов.
+
+        Остальные страницы (изменение, удаление, автодополнение)
+        получают обычный queryset: иначе отложенные поля догружались
+        бы при построении формы отдельными запросами.
+        """
+        queryset = super().get_queryset(request)
+        changelist_url_name = (
+            f"{self.opts.app_label}_{self.opts.model_name}_changelist"
+        )
+        if request.resolver_match.url_name != changelist_url_name:
+            return queryset
+        return (
+            queryset
+            .select_related("author")
+            .only(
+                "id",
+                "name",
+                "image",
+                "cooking_time",
+                "pub_date",
+                "author__username",
+                "author__email",
+            )
+            .annotate(
+                favorites_count=Count("favorite_recipe", distinct=True),
+                short_text=Left("text", TEXT_PREVIEW_LENGTH),
+            )
+            .prefetch_related(
+                "tags",
+                Prefetch(
+                    "recipe",
+                    queryset=RecipeIngredient.objects.select_related(
+                        "ingredient"
+                    ),
+                ),
+            )
+        )
 
     def get_html_photo(self, object):
         if object.image:
-            return mark_safe(f"<img src='{object.image.url}' width=150")
+            return format_html(
+                '<img src="{}" width="{}" loading="lazy">',
+                get_thumbnail_url(object.image, ADMIN_THUMBNAIL_SIZE),
+                ADMIN_THUMBNAIL_SIZE[0],
+            )
 
     get_html_photo.short_description = "Фотография рецепта"
 
+    @admin.display(description="Описание рецепта")
+    def get_short_text(self, obj):
+        return obj.short_text
+
     @admin.display(description="Электронная почта автора")
     def get_author_email(self, obj):
         return obj.author.email
@@ -63,25 +161,19 @@ class RecipeAdmin(admin.ModelAdmin):
 
     @admin.display(description="Тэги")
     def get_tags(self, obj):
-        list_ = [_.name for _ in obj.tags.all()]
-        return ", ".join(list_)
+        return ", ".join(tag.name for tag in obj.tags.all())
 
     @admin.display(description=" Ингредиенты ")
     def get_ingredients(self, obj):
         return "\n ".join(
-            [
-                f'{item["ingredient__name"]} - {item["amount"]}'
-                f' {item["ingredient__measurement_unit"]}.'
-                for item in obj.recipe.values(
-                    "ingredient__name", "amount",
-                    "ingredient__measurement_unit"
-                )
-            ]
+            f"{item.ingredient.name} - {item.amount}"
+            f" {item.ingredient.measurement_unit}."
+            for item in obj.recipe.all()
         )
 
-    @admin.display(description="В избранном")
+    @admin.display(description="В избранном", ordering="favorites_count")
     def get_favorite_count(self, obj):
-        return obj.favorite_recipe.count()
+        return obj.favorites_count
 
 
 @admin.register(Tags)
@@ -114,6 +206,8 @@ class IngredientAdmin(admin.ModelAdmin):
         "measurement_unit",
     )
     empty_value_display = EMPTY_MESSAGE
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(Subscriptions)
@@ -128,35 +222,25 @@ class SubscribeAdmin(admin.ModelAdmin):
         "user__email",
         "author__email",
     )
+    autocomplete_fields = ("user", "author")
     empty_value_display = EMPTY_MESSAGE
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(FavoriteRecipe)
 class FavoriteRecipeAdmin(admin.ModelAdmin):
-    list_display = ("id", "user", "get_recipe", "get_count")
+    list_display = ("id", "user", "recipe")
+    list_select_related = ("user", "recipe__author")
+    search_fields = ("user__email", "recipe__name")
+    autocomplete_fields = ("user", "recipe")
     empty_value_display = EMPTY_MESSAGE
 
-    @admin.display(description="Рецепты")
-    def get_recipe(self, obj):
-        return [
-            f'{item["name"]} '
-            for item in obj.recipe.values("name")[:RECIPE_DISPLAY_LIMIT]
-        ]
-
-    @admin.display(description="В избранном")
-    def get_count(self, obj):
-        return obj.recipe.count()
-
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
-    list_display = ("id", "user", "get_recipe", "get_count")
+    list_display = ("id", "user", "recipe")
+    list_select_related = ("user", "recipe__author")
+    search_fields = ("user__email", "recipe__name")
+    autocomplete_fields = ("user", "recipe")
     empty_value_display = EMPTY_MESSAGE
-
-    @admin.display(description="Рецепты")
-    def get_recipe(self, obj):
-        return [f'{item["name"]} ' for item in obj.recipe.values("name")[:5]]
-
-    @admin.display(description="В корзине")
-    def get_count(self, obj):
-        return obj.recipe.count()
@@ -1,7 +1,7 @@
-import csv
-
 from django.core.management import BaseCommand
+from django.db import connection, transaction
 from recipes.models import Ingredients
+from recipes.signals import bulk_loaded
 
 
 class Command(BaseCommand):
@@ -9,16 +9,36 @@ class Command(BaseCommand):
 
     def handle(self, *args, **kwargs):
         data_path = "app/recipes/management/commands"
+        quote = connection.ops.quote_name
+        table = quote(Ingredients._meta.db_table)
+        columns = ", ".join(
+            quote(Ingredients._meta.get_field(name).column)
+            for name in ("name", "measurement_unit")
+        )
+        # COPY не поддерживает ON CONFLICT, поэтому файл загружается во
+        # временную таблицу, а из нее переносятся только новые строки.
         with open(
             f"{data_path}/ingredients.csv", "r", encoding="utf-8"
-        ) as file:
-            reader = csv.reader(file)
-            next(reader)  # Skip header row
-            ingredients_to_create = [
-                Ingredients(name=row[0], measurement_unit=row[1])
-                for row in reader
-            ]
-            Ingredients.objects.bulk_create(ingredients_to_create)
+        ) as file, transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE ingredients_import "
+                f"ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA"
+            )
+            cursor.copy_expert(
+                f"COPY ingredients_import ({columns}) FROM STDIN WITH CSV",
+                file,
+            )
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) "
+                f"SELECT {columns} FROM ingredients_import "
+                f"ON CONFLICT DO NOTHING"
+            )
+            created = cursor.rowcount
+        # Строки вставлены SQL-запросом без post_save, зависящие
+        # от ингредиентов кеши сбрасываются по сигналу bulk_loaded.
+        bulk_loaded.send(sender=Ingredients)
         self.stdout.write(
-            self.style.SUCCESS("Загрузка ингредиентов прошла успешно")
+            self.style.SUCCESS(
+                f"Загрузка ингредиентов прошла успешно, добавлено: {created}"
+            )
         )
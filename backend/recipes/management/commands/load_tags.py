@@ -1,5 +1,6 @@
 from django.core.management import BaseCommand
 from recipes.models import Tags
+from recipes.signals import bulk_loaded
 
 
 class Command(BaseCommand):
@@ -12,4 +13,7 @@ class Command(BaseCommand):
             {"name": "Ужин", "color": "#8775D2", "slug": "supper"},
         ]
         Tags.objects.bulk_create(Tags(**tag) for tag in data)
+        # bulk_create не отправляет post_save, зависящие от тэгов
+        # кеши сбрасываются по сигналу bulk_loaded.
+        bulk_loaded.send(sender=Tags)
         self.stdout.write(self.style.SUCCESS("Загрузка тэгов прошла успешно"))
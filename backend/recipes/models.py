@@ -1,11 +1,12 @@
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import OpClass
 from django.core.validators import MinValueValidator, RegexValidator
-from django.db.models import (CASCADE, SET_NULL, CharField, DateTimeField,
-                              ForeignKey, ImageField, ManyToManyField, Model,
-                              OneToOneField, PositiveSmallIntegerField,
-                              SlugField, TextField, UniqueConstraint)
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models import (CASCADE, SET_NULL, CharField, CheckConstraint,
+                              DateTimeField, ForeignKey, ImageField, Index,
+                              ManyToManyField, Model,
+                              PositiveSmallIntegerField, Q, SlugField,
+                              TextField, UniqueConstraint)
+from django.db.models.functions import Upper
 
 from .recipes_consts import (HEX_COLOR_VALIDATOR, MAX_LENGTH_COLOR_TAGS,
                              MAX_LENGTH_MEASUREMENT, MAX_LENGTH_NAME_ING,
@@ -26,6 +27,18 @@ class Ingredients(Model):
         ordering = ['name']
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        # Поиск по началу названия (name__istartswith) строится как
+        # UPPER("name"::text) LIKE UPPER(...), индекс повторяет
+        # это выражение. Сортировку и точный поиск по name обслуживает
+        # уникальный индекс (name, measurement_unit).
+        indexes = [
+            Index(
+                OpClass(Upper('name'), name='text_pattern_ops'),
+                name='ingredient_name_prefix_idx')]
+        constraints = [
+            UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient_unit')]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}.'
@@ -53,6 +66,15 @@ class Tags(Model):
         verbose_name = 'Тэг'
         verbose_name_plural = 'Тэги'
         ordering = ['-id']
+        # Формат цвета проверяется валидатором поля в формах
+        # и сериализаторах, ограничение в БД защищает от записи
+        # в обход них, например через bulk_create.
+        constraints = [
+            CheckConstraint(
+                check=Q(color__regex=HEX_COLOR_VALIDATOR),
+                name='tags_color_hex',
+                violation_error_message=(
+                    'Введите корректный цвет в формате HEX'))]
 
     def __str__(self):
         return self.name
@@ -107,30 +129,30 @@ class Recipes(Model):
 
 class FavoriteRecipe(Model):
     """Модель для представления избранных рецептов."""
-    user = OneToOneField(
+    user = ForeignKey(
         User,
         on_delete=CASCADE,
-        null=True,
         related_name='favorite_recipe',
-        verbose_name='Пользователь')
-    recipe = ManyToManyField(
+        verbose_name='Пользователь',
+        db_index=False)
+    recipe = ForeignKey(
         Recipes,
+        on_delete=CASCADE,
         related_name='favorite_recipe',
         verbose_name='Избранный рецепт')
 
     class Meta:
         verbose_name = 'Избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
+        ordering = ['-id']
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_favorite_recipe')]
 
     def __str__(self):
-        list_ = [item['name'] for item in self.recipe.values('name')]
-        return f'Пользователь {self.user} добавил {list_} в избранные.'
-
-    @receiver(post_save, sender=User)
-    def create_favorite_recipe(
-            sender, instance, created, **kwargs):
-        if created:
-            return FavoriteRecipe.objects.create(user=instance)
+        return (f'Пользователь {self.user} добавил '
+                f'{self.recipe.name} в избранные.')
 
 
 class RecipeIngredient(Model):
@@ -138,11 +160,13 @@ class RecipeIngredient(Model):
     recipe = ForeignKey(
         Recipes,
         on_delete=CASCADE,
-        related_name='recipe')
+        related_name='recipe',
+        db_index=False)
     ingredient = ForeignKey(
         Ingredients,
         on_delete=CASCADE,
-        related_name='ingredient')
+        related_name='ingredient',
+        db_index=False)
     amount = PositiveSmallIntegerField(
         default=1,
         validators=(
@@ -154,18 +178,24 @@ class RecipeIngredient(Model):
         verbose_name = 'Количество ингредиента'
         verbose_name_plural = 'Количество ингредиентов'
         ordering = ['-id']
+        # Уникальный индекс начинается с recipe и заменяет отдельный
+        # индекс по этому ключу; колонки id и amount добавлены в него,
+        # чтобы ингредиенты рецепта читались только из индекса.
         constraints = [
             UniqueConstraint(
                 fields=['recipe', 'ingredient'],
+                include=['id', 'amount'],
                 name='unique ingredient')]
+        # Обратный индекс (ingredient, recipe) заменяет индекс по
+        # ingredient и отдает рецепты ингредиента только из индекса.
+        indexes = [
+            Index(
+                fields=['ingredient', 'recipe'],
+                name='ingredient_recipe_idx')]
 
     def __str__(self):
         return f'{self.recipe.name} - {self.ingredient.name}'
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
-
 
 class RecipesTags(Model):
     """Модель для представления связи между рецептом и тегом."""
@@ -174,28 +204,34 @@ class RecipesTags(Model):
         null=True,
         on_delete=CASCADE,
         related_name='recipe_tag',
-        verbose_name='Рецепт')
+        verbose_name='Рецепт',
+        db_index=False)
     tag = ForeignKey(
         Tags,
         null=True,
         on_delete=SET_NULL,
         related_name='tag_recipe',
-        verbose_name='Тэг')
+        verbose_name='Тэг',
+        db_index=False)
 
     class Meta:
+        # Уникальный индекс (recipe, tag) обслуживает и выборку
+        # тэгов рецепта, отдельный индекс по recipe не нужен.
         constraints = [
             UniqueConstraint(
                 fields=('recipe', 'tag'),
                 name='recipe_tag')]
+        # Обратный индекс (tag, recipe) обслуживает фильтр рецептов
+        # по тэгам и заменяет отдельный индекс по tag.
+        indexes = [
+            Index(
+                fields=('tag', 'recipe'),
+                name='tag_recipe_idx')]
         ordering = ('recipe', 'tag')
 
     def __str__(self):
         return f'{self.recipe.name} - {self.tag.name}'
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
-
 
 class Subscriptions(Model):
     """Модель для представления подписок пользователей на авторов."""
@@ -203,12 +239,14 @@ class Subscriptions(Model):
         User,
         on_delete=CASCADE,
         related_name='follower',
-        verbose_name='Подписчик')
+        verbose_name='Подписчик',
+        db_index=False)
     author = ForeignKey(
         User,
         on_delete=CASCADE,
         related_name='following',
-        verbose_name='Автор')
+        verbose_name='Автор',
+        db_index=False)
     created = DateTimeField(
         'Дата подписки',
         auto_now_add=True)
@@ -217,10 +255,17 @@ class Subscriptions(Model):
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         ordering = ['-id']
+        # Уникальный индекс (user, author) обслуживает подписки
+        # пользователя, обратный (author, user) — его подписчиков;
+        # отдельные индексы по внешним ключам не нужны.
         constraints = [
             UniqueConstraint(
                 fields=['user', 'author'],
                 name='unique_subscription')]
+        indexes = [
+            Index(
+                fields=['author', 'user'],
+                name='subs_author_user')]
 
     def __str__(self):
         return f'Пользователь {self.user} подписан на автора {self.author}'
@@ -228,14 +273,15 @@ class Subscriptions(Model):
 
 class ShoppingCart(Model):
     """Модель для представления корзины покупок."""
-    user = OneToOneField(
+    user = ForeignKey(
         User,
         on_delete=CASCADE,
         related_name='shopping_cart',
-        null=True,
-        verbose_name='Пользователь')
-    recipe = ManyToManyField(
+        verbose_name='Пользователь',
+        db_index=False)
+    recipe = ForeignKey(
         Recipes,
+        on_delete=CASCADE,
         related_name='shopping_cart',
         verbose_name='Покупка')
 
@@ -243,13 +289,11 @@ class ShoppingCart(Model):
         verbose_name = 'Покупка'
         verbose_name_plural = 'Покупки'
         ordering = ['-id']
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_shopping_cart')]
 
     def __str__(self):
-        list_ = [item['name'] for item in self.recipe.values('name')]
-        return f'Пользователь {self.user} добавил {list_} в покупки.'
-
-    @receiver(post_save, sender=User)
-    def create_shopping_cart(
-            sender, instance, created, **kwargs):
-        if created:
-            return ShoppingCart.objects.create(user=instance)
+        return (f'Пользователь {self.user} добавил '
+                f'{self.recipe.name} в покупки.')
@@ -0,0 +1,30 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .recipes_consts import ESTIMATED_COUNT_THRESHOLD
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор админки, не выполняющий COUNT(*) по большим таблицам.
+
+    Для списка без фильтров количество строк берется из статистики
+    PostgreSQL (pg_class.reltuples). Если таблица меньше порога
+    ESTIMATED_COUNT_THRESHOLD, статистики еще нет или список
+    отфильтрован, выполняется обычный точный подсчет.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            with connections[queryset.db].cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE relname = %s",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
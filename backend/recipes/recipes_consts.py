@@ -8,4 +8,9 @@ MAX_LENGTH_SLUG_TAGS = 100
 MAX_LENGTH_NAME_RECIPES = 255
 HEX_COLOR_VALIDATOR = r"^#[0-9a-fA-F]{6}$"
 TEXT_PREVIEW_LENGTH = 50
-RECIPE_DISPLAY_LIMIT = 5
+ESTIMATED_COUNT_THRESHOLD = 10000
+ADMIN_THUMBNAIL_SIZE = (150, 150)
+THUMBNAIL_DIR = "recipe/thumbs"
+TOP_AUTHORS_CACHE_KEY = "admin_top_authors"
+TOP_AUTHORS_CACHE_TIMEOUT = 60 * 60
+TOP_AUTHORS_LIMIT = 50
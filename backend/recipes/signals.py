@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Отправляется после массовой загрузки объектов модели (bulk_create,
+# COPY), при которой post_save не вызывается. Отправитель — класс
+# модели, получатели сбрасывают зависящие от нее кеши.
+bulk_loaded = Signal()
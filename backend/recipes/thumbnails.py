@@ -0,0 +1,39 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from .recipes_consts import THUMBNAIL_DIR
+
+
+def get_thumbnail_url(image, size):
+    """
+    Возвращает адрес уменьшенной копии изображения.
+
+    Копия создается Pillow при первом обращении и сохраняется в то же
+    хранилище рядом с оригиналами, дальнейшие обращения только проверяют
+    ее наличие. Если оригинал не удается прочитать, возвращается адрес
+    самого изображения.
+
+    Параметры:
+    - image: Значение поля ImageField.
+    - size: Кортеж (ширина, высота), в который вписывается копия.
+
+    Возвращает:
+    - URL уменьшенной копии.
+    """
+    storage = image.storage
+    width, height = size
+    name = f"{THUMBNAIL_DIR}/{width}x{height}/{os.path.basename(image.name)}"
+    if not storage.exists(name):
+        try:
+            with image.open("rb"), Image.open(image) as picture:
+                image_format = picture.format
+                picture.thumbnail(size)
+                buffer = BytesIO()
+                picture.save(buffer, format=image_format)
+        except (OSError, ValueError):
+            return image.url
+        name = storage.save(name, ContentFile(buffer.getvalue()))
+    return storage.url(name)